@@ -1,10 +1,25 @@
+import queue
+import shutil
+import subprocess
+import threading
 import time
 import cv2
+import numpy as np
 from typing import Optional, Tuple
 
 from agent.sim_api import SimAPI
 from agent.vision import obstacle_mask, sample_headings, annotate_debug
-from agent.planner import pick_heading, step_from_heading, goal_bearing_from_position, close_to_goal
+from agent.planner import (
+    specialize_pick_heading,
+    step_from_heading,
+    goal_bearing_from_position,
+    close_to_goal,
+)
+
+try:
+    from agent.planner_numba import pick_heading
+except ImportError:  # numba not installed
+    from agent.planner import pick_heading
 
 
 class NavigatorConfig:
@@ -16,7 +31,87 @@ class NavigatorConfig:
     NUM_HEADINGS = 31
     MAX_STEPS = 1200
     GOAL_RADIUS = 3.0
+    TARGET_DT = 0.05  # target control period (s); only the remainder is slept
     SAVE_DEBUG = True
+    VISION_SIZE = (160, 120)  # (w, h) fed to obstacle_mask
+    FRAME_DIFF_THR = 5.0  # mean abs pixel diff below which the mask is reused
+    POSE_EPS = 0.25  # pose delta below which headings are reused too
+
+
+class _AsyncVideoWriter:
+    """Encodes debug frames on a background thread so the control loop
+    never stalls on writer.write; full frames are dropped over stalling."""
+
+    def __init__(self, path: str, fps: float = 10.0, size: Tuple[int, int] = (640, 480)):
+        self.size = size
+        # Prefer piping raw frames to ffmpeg with the ultrafast x264
+        # preset, which encodes several times faster than OpenCV's mp4v;
+        # fall back to cv2.VideoWriter when ffmpeg is not on PATH.
+        self._proc = None
+        self._writer = None
+        if shutil.which("ffmpeg"):
+            self._proc = subprocess.Popen(
+                [
+                    "ffmpeg", "-y", "-loglevel", "error",
+                    "-f", "rawvideo", "-pix_fmt", "bgr24",
+                    "-s", f"{size[0]}x{size[1]}", "-r", str(fps), "-i", "-",
+                    "-c:v", "libx264", "-preset", "ultrafast", path,
+                ],
+                stdin=subprocess.PIPE,
+            )
+        else:
+            fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+            self._writer = cv2.VideoWriter(path, fourcc, fps, size)
+        self._buf = np.empty((size[1], size[0], 3), np.uint8)
+        self._queue: "queue.Queue[Optional[np.ndarray]]" = queue.Queue(maxsize=4)
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def _drain(self) -> None:
+        # Keep consuming until the sentinel even if the encoder dies:
+        # exiting early would leave the queue filling up with no reader
+        # and release()'s sentinel put blocking forever.
+        broken = False
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            if broken:
+                continue
+            if self._proc is not None:
+                try:
+                    self._proc.stdin.write(frame.tobytes())
+                except (BrokenPipeError, OSError):
+                    broken = True
+            else:
+                self._writer.write(frame)
+
+    def write(self, frame: np.ndarray) -> None:
+        if frame.shape[:2] != (self.size[1], self.size[0]):
+            cv2.resize(frame, self.size, dst=self._buf)
+            frame = self._buf
+        try:
+            # Copy: the resize buffer is reused on the next call.
+            self._queue.put_nowait(frame.copy())
+        except queue.Full:
+            pass
+
+    def release(self) -> None:
+        try:
+            # Timeout guards against a dead drain thread and a full queue;
+            # blocking here would hang Navigator.run's finally block.
+            self._queue.put(None, timeout=1.0)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=5.0)
+        if self._proc is not None:
+            try:
+                self._proc.stdin.close()
+                self._proc.wait(timeout=10.0)
+            except (OSError, subprocess.TimeoutExpired):
+                self._proc.kill()
+        else:
+            self._writer.release()
 
 
 class Navigator:
@@ -26,6 +121,20 @@ class Navigator:
         self.moving = moving
         self.speed = speed
         self.goal = None
+        # Weights are fixed for the run; bind them once instead of
+        # re-reading NavigatorConfig every step.
+        self._pick = specialize_pick_heading(
+            NavigatorConfig.OBS_W,
+            NavigatorConfig.GOAL_W,
+            NavigatorConfig.SAFE_THR,
+            picker=pick_heading,
+        )
+        # Previous-frame cache: reuse the mask/headings when the scene
+        # and pose have barely changed between captures.
+        self._prev_small = None
+        self._prev_mask = None
+        self._prev_headings = None
+        self._prev_pos = None
 
     def set_goal(self) -> None:
         resp = self.api.set_goal_corner(self.corner)
@@ -69,6 +178,11 @@ class Navigator:
         self.set_goal()
         self.enable_obstacles_motion()
 
+        self._prev_small = None
+        self._prev_mask = None
+        self._prev_headings = None
+        self._prev_pos = None
+
         collisions0 = self.api.collisions()
         coll_prev = collisions0
         total_collisions = 0
@@ -76,37 +190,66 @@ class Navigator:
         writer = None
         try:
             if video_path and NavigatorConfig.SAVE_DEBUG:
-                fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-                writer = cv2.VideoWriter(video_path, fourcc, 10.0, (640, 480))
+                writer = _AsyncVideoWriter(video_path, fps=10.0, size=(640, 480))
 
             steps = 0
+            pending_turn = 0.0
+            pending_dist = 0.0
             while steps < NavigatorConfig.MAX_STEPS:
-                img, pos, ts = self.api.capture()
+                t0 = time.perf_counter()
+                # /tick applies the move planned from the previous frame
+                # and returns the next frame plus the collision count in
+                # one round-trip.
+                img, pos, c, ts = self.api.tick(pending_turn, pending_dist)
                 if img is None or pos is None:
+                    pending_turn = 0.0
+                    pending_dist = 0.0
                     time.sleep(0.05)
                     continue
 
-                # Vision
-                mask = obstacle_mask(img)
-                headings = sample_headings(mask, NavigatorConfig.NUM_HEADINGS, NavigatorConfig.FOV_DEG)
+                # Vision runs on a downsampled frame; 31 coarse heading
+                # columns don't need full resolution. Keep the full frame
+                # only for the debug overlay.
+                small = cv2.resize(img, NavigatorConfig.VISION_SIZE, interpolation=cv2.INTER_AREA)
+
+                # Consecutive frames at slow obstacle speeds are near
+                # identical; a cheap absdiff check decides whether the
+                # previous mask (and headings) can be reused.
+                frame_still = (
+                    self._prev_small is not None
+                    and float(cv2.absdiff(small, self._prev_small).mean()) < NavigatorConfig.FRAME_DIFF_THR
+                )
+                if frame_still:
+                    mask = self._prev_mask
+                else:
+                    mask = obstacle_mask(small)
+                    self._prev_small = small
+                    self._prev_mask = mask
+
+                pose_still = (
+                    frame_still
+                    and self._prev_pos is not None
+                    and abs(float(pos.get("x", 0.0)) - self._prev_pos[0]) < NavigatorConfig.POSE_EPS
+                    and abs(float(pos.get("z", 0.0)) - self._prev_pos[1]) < NavigatorConfig.POSE_EPS
+                )
+                if pose_still and self._prev_headings is not None:
+                    angles, costs = self._prev_headings
+                else:
+                    angles, costs = sample_headings(mask, NavigatorConfig.NUM_HEADINGS, NavigatorConfig.FOV_DEG)
+                    self._prev_headings = (angles, costs)
+                self._prev_pos = (float(pos.get("x", 0.0)), float(pos.get("z", 0.0)))
 
                 # Goal bearing
                 goal_bearing = goal_bearing_from_position(pos, self.goal)
 
                 # Pick
-                ang, _score = pick_heading(
-                    headings,
-                    goal_bearing,
-                    obs_w=NavigatorConfig.OBS_W,
-                    goal_w=NavigatorConfig.GOAL_W,
-                    safe_thr=NavigatorConfig.SAFE_THR,
-                )
+                ang, _score = self._pick(angles, costs, goal_bearing)
                 step = step_from_heading(ang, NavigatorConfig.STEP_DIST)
-                self.api.move_rel(step["turn"], step["distance"])
+                pending_turn = step["turn"]
+                pending_dist = step["distance"]
 
-                # Collisions
-                c = self.api.collisions()
-                if c > coll_prev:
+                # Collisions (reported in the tick response)
+                if c is not None and c > coll_prev:
                     total_collisions += (c - coll_prev)
                     coll_prev = c
                     # Back off slightly
@@ -124,18 +267,15 @@ class Navigator:
                         mask,
                         f"Goal:{self.corner} Steps:{steps} Collisions:{total_collisions}",
                     )
-                    # Resize to standard size for writer
-                    try:
-                        out = cv2.resize(overlay, (640, 480))
-                    except Exception:
-                        out = overlay
-                    writer.write(out)
+                    writer.write(overlay)
 
                 steps += 1
-                time.sleep(0.05)
-
-            if writer:
-                writer.release()
+                # /tick already blocks until the next fresh frame, so only
+                # sleep off whatever is left of the target period instead of
+                # a fixed 50ms that capped the loop at 20 Hz.
+                remaining = NavigatorConfig.TARGET_DT - (time.perf_counter() - t0)
+                if remaining > 0:
+                    time.sleep(remaining)
 
             return total_collisions, steps
         finally:
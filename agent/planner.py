@@ -1,31 +1,45 @@
 import math
-from typing import Dict, List, Tuple
+from typing import Dict, Tuple
+
+import numpy as np
 
 
 def pick_heading(
-    heading_costs: List[Tuple[float, float]],
+    angles: np.ndarray,
+    costs: np.ndarray,
     goal_angle_deg: float,
     obs_w: float = 1.2,
     goal_w: float = 0.6,
     safe_thr: float = 0.35,
 ) -> Tuple[float, float]:
-    best_angle = 0.0
-    best_cost = float("inf")
-    for ang, oc in heading_costs:
-        ang_err = abs(ang - goal_angle_deg) / 60.0
-        score = obs_w * oc + goal_w * ang_err
-        if oc < safe_thr and score < best_cost:
-            best_cost = score
-            best_angle = ang
-    if best_cost == float("inf"):
+    ang_err = np.abs(angles - goal_angle_deg) / 60.0
+    score = obs_w * costs + goal_w * ang_err
+    safe = costs < safe_thr
+    if safe.any():
+        idx = np.where(safe, score, np.inf).argmin()
+    else:
         # No safe option, pick the least bad
-        for ang, oc in heading_costs:
-            ang_err = abs(ang - goal_angle_deg) / 60.0
-            score = obs_w * oc + goal_w * ang_err
-            if score < best_cost:
-                best_cost = score
-                best_angle = ang
-    return best_angle, best_cost
+        idx = score.argmin()
+    return float(angles[idx]), float(score[idx])
+
+
+def specialize_pick_heading(
+    obs_w: float = 1.2,
+    goal_w: float = 0.6,
+    safe_thr: float = 0.35,
+    picker=pick_heading,
+):
+    """Bind the scoring weights once for a run.
+
+    The weights never change within a run, so the hot loop can call the
+    returned closure with just (angles, costs, goal_angle_deg) instead of
+    re-reading config attributes and passing keywords every step.
+    """
+
+    def picked(angles: np.ndarray, costs: np.ndarray, goal_angle_deg: float) -> Tuple[float, float]:
+        return picker(angles, costs, goal_angle_deg, obs_w, goal_w, safe_thr)
+
+    return picked
 
 
 def step_from_heading(angle_deg: float, step_dist: float) -> Dict[str, float]:
@@ -48,6 +62,7 @@ def goal_bearing_from_position(pos: Dict[str, float], goal: Dict[str, float]) ->
 def close_to_goal(pos: Dict[str, float], goal: Dict[str, float], radius: float = 3.0) -> bool:
     dx = float(goal["x"]) - float(pos.get("x", 0.0))
     dz = float(goal["z"]) - float(pos.get("z", 0.0))
-    return (dx * dx + dz * dz) ** 0.5 <= float(radius)
+    # Compare squared distances; no sqrt needed for a threshold test.
+    return dx * dx + dz * dz <= radius * radius
 
 
@@ -0,0 +1,57 @@
+"""Numba-compiled planner kernels.
+
+Importing this module requires numba; call sites fall back to the NumPy
+implementations in `agent.planner` / `agent.vision` when it is missing.
+"""
+
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True, fastmath=True)
+def pick_heading(
+    angles: np.ndarray,
+    costs: np.ndarray,
+    goal_angle_deg: float,
+    obs_w: float = 1.2,
+    goal_w: float = 0.6,
+    safe_thr: float = 0.35,
+):
+    # Single fused pass tracking the best safe and best overall heading.
+    best_safe_idx = -1
+    best_safe = np.inf
+    best_any_idx = 0
+    best_any = np.inf
+    for i in range(angles.shape[0]):
+        ang_err = abs(angles[i] - goal_angle_deg) / 60.0
+        score = obs_w * costs[i] + goal_w * ang_err
+        if score < best_any:
+            best_any = score
+            best_any_idx = i
+        if costs[i] < safe_thr and score < best_safe:
+            best_safe = score
+            best_safe_idx = i
+    if best_safe_idx >= 0:
+        return angles[best_safe_idx], best_safe
+    return angles[best_any_idx], best_any
+
+
+@njit(cache=True)
+def band_costs(band: np.ndarray, cols: np.ndarray) -> np.ndarray:
+    # Occupancy fraction of each sampled column of the mask band.
+    h = band.shape[0]
+    inv = 1.0 / h
+    out = np.empty(cols.shape[0], np.float64)
+    for j in range(cols.shape[0]):
+        c = cols[j]
+        hits = 0
+        for y in range(h):
+            if band[y, c] != 0:
+                hits += 1
+        out[j] = hits * inv
+    return out
+
+
+# Warm the JIT at import so the first control step doesn't pay compile time.
+pick_heading(np.linspace(-60.0, 60.0, 5), np.zeros(5), 0.0)
+band_costs(np.zeros((4, 8), np.uint8), np.zeros(5, np.int32))
@@ -1,7 +1,8 @@
 import time
 import requests
+from requests.adapters import HTTPAdapter
 import numpy as np
-import base64
+import binascii
 import cv2
 from typing import Optional, Tuple, Dict, Any
 
@@ -10,7 +11,20 @@ class SimAPI:
     def __init__(self, base: str = "http://localhost:5000"):
         self.base = base.rstrip("/")
         self.sess = requests.Session()
+        # The capture loop issues many small requests per step; a pooled
+        # keep-alive adapter avoids re-opening connections.
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+        self.sess.mount("http://", adapter)
+        self.sess.headers["Connection"] = "keep-alive"
         self._last_capture_ts: Optional[int] = None
+        # Hot-path URLs, built once.
+        self._url_capture = f"{self.base}/capture"
+        self._url_capture_blocking = f"{self.base}/capture_blocking"
+        self._url_last_capture = f"{self.base}/last_capture"
+        self._url_last_capture_png = f"{self.base}/last_capture.png"
+        self._url_move_rel = f"{self.base}/move_rel"
+        self._url_collisions = f"{self.base}/collisions"
+        self._url_tick = f"{self.base}/tick"
 
     def reset(self) -> Dict[str, Any]:
         r = self.sess.post(f"{self.base}/reset", timeout=5)
@@ -33,7 +47,7 @@ class SimAPI:
 
     def move_rel(self, turn_deg: float, distance: float) -> Dict[str, Any]:
         r = self.sess.post(
-            f"{self.base}/move_rel",
+            self._url_move_rel,
             json={"turn": float(turn_deg), "distance": float(distance)},
             timeout=5,
         )
@@ -50,7 +64,7 @@ class SimAPI:
         return r.json()
 
     def collisions(self) -> int:
-        r = self.sess.get(f"{self.base}/collisions", timeout=5)
+        r = self.sess.get(self._url_collisions, timeout=5)
         r.raise_for_status()
         return int(r.json().get("count", 0))
 
@@ -73,20 +87,28 @@ class SimAPI:
 
     def _get_last_capture(self) -> Optional[Dict[str, Any]]:
         try:
-            r = self.sess.get(f"{self.base}/last_capture", timeout=3)
+            r = self.sess.get(self._url_last_capture, timeout=3)
             if r.status_code != 200:
                 return None
             return r.json()
         except requests.RequestException:
             return None
 
-    def capture(self, wait_timeout_s: float = 2.0) -> Tuple[Optional[np.ndarray], Optional[Dict[str, float]], Optional[int]]:
-        # Trigger a capture in the simulator
-        self.sess.post(f"{self.base}/capture", timeout=5)
+    def capture_raw(self) -> Optional[np.ndarray]:
+        """Fetch the last frame as raw PNG bytes, skipping base64 transport."""
+        try:
+            r = self.sess.get(self._url_last_capture_png, timeout=3)
+        except requests.RequestException:
+            return None
+        if r.status_code != 200:
+            return None
+        arr = np.frombuffer(r.content, np.uint8)
+        return cv2.imdecode(arr, cv2.IMREAD_COLOR)
 
-        # Poll for a fresh capture
+    def _poll_capture(self, wait_timeout_s: float) -> Optional[Dict[str, Any]]:
+        # Legacy path for servers without /capture_blocking: trigger, then poll.
+        self.sess.post(self._url_capture, timeout=5)
         start = time.time()
-        latest: Optional[Dict[str, Any]] = None
         while time.time() - start < wait_timeout_s:
             data = self._get_last_capture()
             if not data:
@@ -96,12 +118,31 @@ class SimAPI:
             if ts is None or (self._last_capture_ts is not None and ts == self._last_capture_ts):
                 time.sleep(0.05)
                 continue
-            latest = data
-            break
+            return data
+        return None
+
+    def capture(self, wait_timeout_s: float = 2.0) -> Tuple[Optional[np.ndarray], Optional[Dict[str, float]], Optional[int]]:
+        # Long-poll: the server triggers the capture and holds the request
+        # until a fresh frame lands, saving the 50ms client polling jitter.
+        latest: Optional[Dict[str, Any]] = None
+        try:
+            r = self.sess.get(
+                self._url_capture_blocking,
+                params={"since": self._last_capture_ts or 0, "timeout": wait_timeout_s},
+                timeout=wait_timeout_s + 1.0,
+            )
+            if r.status_code == 200:
+                latest = r.json()
+            elif r.status_code == 404:
+                latest = self._poll_capture(wait_timeout_s)
+        except requests.RequestException:
+            latest = None
 
         if not latest:
             return None, None, None
+        return self._decode_capture(latest)
 
+    def _decode_capture(self, latest: Dict[str, Any]) -> Tuple[Optional[np.ndarray], Optional[Dict[str, float]], Optional[int]]:
         # Remember timestamp
         ts_val = latest.get("timestamp")
         if isinstance(ts_val, (int, float)):
@@ -109,22 +150,43 @@ class SimAPI:
 
         # Image may be data URL or raw base64
         img_b64_or_url = latest.get("image", "") or ""
-        if isinstance(img_b64_or_url, str) and img_b64_or_url.startswith("data:image"):
-            # Strip header: data:image/png;base64,
-            try:
-                header, b64 = img_b64_or_url.split(",", 1)
-            except ValueError:
-                b64 = ""
+        if isinstance(img_b64_or_url, str) and img_b64_or_url.startswith("data:"):
+            b64 = img_b64_or_url.partition(",")[2]
         else:
             b64 = img_b64_or_url
 
         img = None
         if b64:
-            img_bytes = base64.b64decode(b64)
+            img_bytes = binascii.a2b_base64(b64)
             arr = np.frombuffer(img_bytes, np.uint8)
             img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
 
         pos = latest.get("position")
         return img, pos, self._last_capture_ts
 
+    def tick(
+        self, turn_deg: float, distance: float, wait_timeout_s: float = 2.0
+    ) -> Tuple[Optional[np.ndarray], Optional[Dict[str, float]], Optional[int], Optional[int]]:
+        """One control step over a single request (see server /tick).
+
+        Applies the relative move and returns (img, pos, collisions, ts)
+        from the next fresh frame, instead of four sequential calls.
+        """
+        payload = {
+            "turn": float(turn_deg),
+            "distance": float(distance),
+            "since": self._last_capture_ts or 0,
+            "timeout": wait_timeout_s,
+        }
+        try:
+            r = self.sess.post(self._url_tick, json=payload, timeout=wait_timeout_s + 1.0)
+        except requests.RequestException:
+            return None, None, None, None
+        if r.status_code != 200:
+            return None, None, None, None
+        data = r.json()
+        img, pos, ts = self._decode_capture(data)
+        coll = data.get("collisions")
+        return img, pos, (int(coll) if coll is not None else None), ts
+
 
@@ -1,7 +1,6 @@
 import os
-import time
 import statistics
-import matplotlib.pyplot as plt
+from concurrent.futures import ThreadPoolExecutor
 
 from agent.sim_api import SimAPI
 from agent.agent import Navigator
@@ -13,27 +12,46 @@ def ensure_dirs():
     os.makedirs("results/graphs", exist_ok=True)
 
 
+def run_one(base, speed, corner):
+    api = SimAPI(base=base)
+    video = None  # speed up runs; set a path to save visualizations
+    nav = Navigator(api, corner=corner, moving=True, speed=speed)
+    col, steps = nav.run(video_path=video)
+    print(f"Speed {speed} corner {corner}: collisions={col}, steps={steps}")
+    return col
+
+
 def main():
     ensure_dirs()
     speeds = [0.04, 0.06, 0.08, 0.10]
     corners = ["NE", "NW", "SE", "SW"]
 
-    api = SimAPI()
+    # One simulator/server instance per corner so runs can go in
+    # parallel; set SIM_BASES to comma-separated URLs to override.
+    env_bases = os.environ.get("SIM_BASES")
+    if env_bases:
+        bases = [b.strip() for b in env_bases.split(",") if b.strip()]
+        if len(bases) < len(corners):
+            # ex.map zips to the shortest iterable, which would silently
+            # skip corners and average over a partial run.
+            raise SystemExit(
+                f"SIM_BASES supplies {len(bases)} URL(s) but {len(corners)} corners need one each"
+            )
+    else:
+        bases = [f"http://localhost:{5000 + i}" for i in range(len(corners))]
+
     avgs = []
 
     for sp in speeds:
-        cols = []
-        for c in corners:
-            ts = int(time.time())
-            video = None  # speed up runs; set a path to save visualizations
-            nav = Navigator(api, corner=c, moving=True, speed=sp)
-            col, steps = nav.run(video_path=video)
-            print(f"Speed {sp} corner {c}: collisions={col}, steps={steps}")
-            cols.append(col)
+        with ThreadPoolExecutor(max_workers=len(corners)) as ex:
+            cols = list(ex.map(run_one, bases, [sp] * len(corners), corners))
         avg = statistics.mean(cols)
         print(f"Speed {sp}: avg collisions={avg}")
         avgs.append(avg)
 
+    # Imported here so the sweep itself doesn't pay matplotlib's startup.
+    import matplotlib.pyplot as plt
+
     plt.figure(figsize=(6, 4))
     plt.plot(speeds, avgs, marker='o')
     plt.xlabel("Obstacle speed")
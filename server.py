@@ -1,9 +1,34 @@
 import asyncio
+import base64
+import binascii
 import json
+import logging
+import os
+import time
 import websockets
 from flask import Flask, request, jsonify
 import threading
 
+try:  # orjson parses/serializes 2-10x faster; stdlib json is the fallback
+    import orjson
+    _loads = orjson.loads
+
+    def _dumps(obj) -> str:
+        # orjson emits bytes; websockets text frames want str
+        return orjson.dumps(obj).decode()
+except ImportError:
+    _loads = json.loads
+    _dumps = json.dumps
+
+try:  # serve the Flask app over ASGI in the same process as the WS loop
+    from asgiref.wsgi import WsgiToAsgi
+    from hypercorn.asyncio import serve as hypercorn_serve
+    from hypercorn.config import Config as HypercornConfig
+except ImportError:  # fall back to the Werkzeug dev server in a thread
+    WsgiToAsgi = None
+
+log = logging.getLogger(__name__)
+
 app = Flask(__name__)
 
 # --- CORS: allow simple cross-origin calls from control page ---
@@ -21,63 +46,127 @@ connected = set()
 async_loop = None
 collision_count = 0  # <-- new: server-tracked collisions
 last_capture = None   # <-- new: store last capture payload from simulator
+pending_capture_meta = None  # metadata text frame preceding a binary PNG frame
 
 FLOOR_HALF = 50  # index.html uses PlaneGeometry(100, 100) centered at origin
 
+# Canonical corners plus aliases -> (sign_x, sign_z); replaces the old
+# branch cascade with a single lookup.
+_CORNER_SIGNS = {
+    "NE": (1, -1), "EN": (1, -1), "TR": (1, -1),
+    "NW": (-1, -1), "WN": (-1, -1), "TL": (-1, -1),
+    "SE": (1, 1), "ES": (1, 1), "BR": (1, 1),
+    "SW": (-1, 1), "WS": (-1, 1), "BL": (-1, 1),
+}
+
 def corner_to_coords(corner: str, margin=5):
-    c = corner.upper()
-    x = FLOOR_HALF - margin if "E" in c else -(FLOOR_HALF - margin)
-    z = FLOOR_HALF - margin if ("S" in c or "B" in c) else -(FLOOR_HALF - margin)
-    if c in ("NE", "EN", "TR"): x, z = (FLOOR_HALF - margin, -(FLOOR_HALF - margin))
-    if c in ("NW", "WN", "TL"): x, z = (-(FLOOR_HALF - margin), -(FLOOR_HALF - margin))
-    if c in ("SE", "ES", "BR"): x, z = (FLOOR_HALF - margin, (FLOOR_HALF - margin))
-    if c in ("SW", "WS", "BL"): x, z = (-(FLOOR_HALF - margin), (FLOOR_HALF - margin))
-    return {"x": x, "y": 0, "z": z}
+    sx, sz = _CORNER_SIGNS[corner.upper()]  # KeyError for unknown corners
+    inset = FLOOR_HALF - margin
+    return {"x": sx * inset, "y": 0, "z": sz * inset}
 
 # ---------------------------
 # WebSocket Handler
 # ---------------------------
-async def ws_handler(websocket, path=None):
+def _on_collision(data):
     global collision_count
+    if data.get("collision"):
+        collision_count += 1
+
+def _on_capture_meta(data):
+    global pending_capture_meta
+    pending_capture_meta = data
+
+def _on_capture_response(data):
+    # Normalize image: allow either full data URL or raw base64
     global last_capture
-    print("Client connected via WebSocket")
+    last_capture = {
+        "image": data.get("image"),
+        "timestamp": data.get("timestamp"),
+        "position": data.get("position"),
+    }
+
+# Dispatch by message type instead of an if-elif chain per frame.
+_WS_HANDLERS = {
+    "collision": _on_collision,
+    "capture_image_meta": _on_capture_meta,
+    "capture_image_response": _on_capture_response,
+}
+
+async def ws_handler(websocket, path=None):
+    global last_capture
+    global pending_capture_meta
+    log.info("Client connected via WebSocket")
     connected.add(websocket)
     try:
         async for message in websocket:
-            # Record any simulator messages and increment collision_count on "collision"
+            # Binary frame: a raw PNG capture, paired with the metadata
+            # from the preceding capture_image_meta text frame. Skips the
+            # base64 inflation of the data-URL path entirely.
+            if isinstance(message, (bytes, bytearray)):
+                meta = pending_capture_meta or {}
+                pending_capture_meta = None
+                last_capture = {
+                    "image": None,
+                    "image_bytes": bytes(message),
+                    "timestamp": meta.get("timestamp"),
+                    "position": meta.get("position"),
+                }
+                continue
+            # Only '{'-prefixed text frames can be objects we care about;
+            # gating up front skips the parse/exception path for the rest.
+            if not message or message[0] != '{':
+                continue
             try:
-                data = json.loads(message)
-                if isinstance(data, dict):
-                    # Track collisions
-                    if data.get("type") == "collision" and data.get("collision"):
-                        collision_count += 1
-                    # Track last capture image/position/timestamp
-                    if data.get("type") == "capture_image_response":
-                        # Normalize image: allow either full data URL or raw base64
-                        img = data.get("image")
-                        ts = data.get("timestamp")
-                        pos = data.get("position")
-                        last = {
-                            "image": img,
-                            "timestamp": ts,
-                            "position": pos,
-                        }
-                        last_capture = last
-            except Exception:
-                pass
-            print("Received from simulator:", message)
+                data = _loads(message)
+            except ValueError:
+                continue
+            if not isinstance(data, dict):
+                continue
+            mtype = data.get("type")
+            handler = _WS_HANDLERS.get(mtype)
+            if handler is not None:
+                handler(data)
+            # Stringifying whole payloads on stdout dominated this handler;
+            # log type and length only, and skip image frames entirely.
+            if mtype != "capture_image_response" and log.isEnabledFor(logging.DEBUG):
+                log.debug("Received from simulator: type=%s len=%d", mtype, len(message))
     except websockets.exceptions.ConnectionClosed:
-        print("Client disconnected")
+        log.info("Client disconnected")
     finally:
         connected.remove(websocket)
 
-def broadcast(msg: dict):
+# Clients per batch when fanning out to many simulators at once.
+BROADCAST_BATCH_SIZE = int(os.environ.get("BROADCAST_BATCH_SIZE", "50"))
+
+async def _bcast(payload: str):
+    # websockets.broadcast does one synchronous transport.write per client,
+    # with no per-client Task allocation.
+    clients = list(connected)
+    if len(clients) <= BROADCAST_BATCH_SIZE:
+        websockets.broadcast(clients, payload)
+        return
+    # Large fan-outs go out in batches, yielding between them so the loop
+    # keeps servicing incoming simulator messages.
+    for i in range(0, len(clients), BROADCAST_BATCH_SIZE):
+        websockets.broadcast(clients[i : i + BROADCAST_BATCH_SIZE], payload)
+        await asyncio.sleep(0)
+
+def broadcast_raw(payload: str):
+    """Broadcast a pre-serialized JSON payload."""
     if not connected:
         return False
-    for ws in list(connected):
-        asyncio.run_coroutine_threadsafe(ws.send(json.dumps(msg)), async_loop)
+    asyncio.run_coroutine_threadsafe(_bcast(payload), async_loop)
     return True
 
+def broadcast(msg: dict):
+    return broadcast_raw(_dumps(msg))  # serialize once, not per client
+
+# Constant command payloads, serialized once at import; the capture one in
+# particular goes out on every control tick.
+CAPTURE_MSG = _dumps({"command": "capture_image"})
+STOP_MSG = _dumps({"command": "stop"})
+RESET_MSG = _dumps({"command": "reset"})
+
 # ---------------------------
 # Existing Endpoints
 # ---------------------------
@@ -104,17 +193,15 @@ def move_rel():
 
 @app.route('/stop', methods=['POST'])
 def stop():
-    msg = {"command": "stop"}
-    if not broadcast(msg):
+    if not broadcast_raw(STOP_MSG):
         return jsonify({'error': 'No connected simulators.'}), 400
-    return jsonify({'status': 'stop command sent', 'command': msg})
+    return jsonify({'status': 'stop command sent', 'command': {"command": "stop"}})
 
 @app.route('/capture', methods=['POST'])
 def capture():
-    msg = {"command": "capture_image"}
-    if not broadcast(msg):
+    if not broadcast_raw(CAPTURE_MSG):
         return jsonify({'error': 'No connected simulators.'}), 400
-    return jsonify({'status': 'capture command sent', 'command': msg})
+    return jsonify({'status': 'capture command sent', 'command': {"command": "capture_image"}})
 
 # ---------------------------
 # Goal + Obstacles (from your previous step)
@@ -123,7 +210,10 @@ def capture():
 def set_goal():
     data = request.get_json() or {}
     if 'corner' in data:
-        pos = corner_to_coords(str(data['corner']))
+        try:
+            pos = corner_to_coords(str(data['corner']))
+        except KeyError:
+            return jsonify({'error': 'Unknown corner; use NE|NW|SE|SW (or TR/TL/BR/BL).'}), 400
     elif 'x' in data and 'z' in data:
         pos = {"x": float(data['x']), "y": float(data.get('y', 0)), "z": float(data['z'])}
     else:
@@ -178,6 +268,16 @@ def get_collisions():
     """Return the total number of collisions seen (from simulator messages)."""
     return jsonify({'count': collision_count})
 
+def capture_to_json(cap: dict) -> dict:
+    """JSON-safe view of a capture record.
+
+    Binary frames are base64-encoded once on first use and the result is
+    cached back onto the record so repeated reads don't re-encode.
+    """
+    if cap.get('image') is None and cap.get('image_bytes') is not None:
+        cap['image'] = base64.b64encode(cap['image_bytes']).decode('ascii')
+    return {k: v for k, v in cap.items() if k != 'image_bytes'}
+
 @app.route('/last_capture', methods=['GET'])
 def get_last_capture():
     """Return the last capture payload received over WebSocket from the simulator.
@@ -187,22 +287,96 @@ def get_last_capture():
     """
     if not last_capture:
         return jsonify({'error': 'no capture available yet'}), 404
-    return jsonify(last_capture)
+    return jsonify(capture_to_json(last_capture))
+
+@app.route('/last_capture.png', methods=['GET'])
+def get_last_capture_png():
+    """Return the last captured frame as raw PNG bytes.
+
+    Skips the base64 data-URL wrapping of /last_capture (~33% smaller
+    payload, no client-side decode of a huge string).
+    """
+    if not last_capture:
+        return jsonify({'error': 'no capture available yet'}), 404
+    if last_capture.get('image_bytes') is not None:
+        # Binary frame from the simulator: serve it as-is, zero decode.
+        return app.response_class(last_capture['image_bytes'], mimetype='image/png')
+    if not last_capture.get('image'):
+        return jsonify({'error': 'no capture available yet'}), 404
+    img = last_capture['image']
+    b64 = img.partition(",")[2] if img.startswith("data:") else img
+    try:
+        raw = base64.b64decode(b64)
+    except (ValueError, binascii.Error):
+        return jsonify({'error': 'stored capture is not valid base64'}), 500
+    return app.response_class(raw, mimetype='image/png')
+
+@app.route('/capture_blocking', methods=['GET'])
+def capture_blocking():
+    """Trigger a capture and block until a frame newer than "since" arrives.
+
+    Long-poll replacement for POST /capture + GET /last_capture polling:
+    one round-trip instead of a client-side sleep loop.
+    """
+    since = request.args.get('since', type=int)
+    timeout_s = request.args.get('timeout', default=2.0, type=float)
+    if not broadcast_raw(CAPTURE_MSG):
+        return jsonify({'error': 'No connected simulators.'}), 400
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        cap = last_capture
+        if cap and cap.get('timestamp') is not None and cap.get('timestamp') != since:
+            return jsonify(capture_to_json(cap))
+        time.sleep(0.01)
+    return jsonify({'error': 'timed out waiting for capture'}), 504
+
+@app.route('/tick', methods=['POST'])
+def tick():
+    """One control step in a single round-trip.
+
+    Applies an optional relative move, triggers a capture, then blocks
+    until a frame newer than "since" arrives and returns it together
+    with the collision count. Collapses the move_rel + capture +
+    last_capture + collisions sequence into one request.
+    """
+    data = request.get_json() or {}
+    since = data.get('since')
+    timeout_s = float(data.get('timeout', 2.0))
+    if 'turn' in data or 'distance' in data:
+        move = {
+            "command": "move_relative",
+            "turn": float(data.get('turn', 0.0)),
+            "distance": float(data.get('distance', 0.0)),
+        }
+        if not broadcast(move):
+            return jsonify({'error': 'No connected simulators.'}), 400
+    if not broadcast_raw(CAPTURE_MSG):
+        return jsonify({'error': 'No connected simulators.'}), 400
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        cap = last_capture
+        if cap and cap.get('timestamp') is not None and cap.get('timestamp') != since:
+            resp = capture_to_json(cap)
+            resp['collisions'] = collision_count
+            return jsonify(resp)
+        time.sleep(0.01)
+    return jsonify({'error': 'timed out waiting for capture', 'collisions': collision_count}), 504
 
 @app.route('/reset', methods=['POST'])
 def reset():
     """Reset collision count and broadcast a reset command to the simulator."""
     global collision_count
     collision_count = 0
-    if not broadcast({"command": "reset"}):
+    if not broadcast_raw(RESET_MSG):
         # Even if no simulator is connected, we consider the counter reset.
         return jsonify({'status': 'reset done (no simulators connected)', 'collisions': collision_count})
     return jsonify({'status': 'reset broadcast', 'collisions': collision_count})
 
 # ---------------------------
-# Flask Thread
+# Flask Serving
 # ---------------------------
 def start_flask():
+    # Werkzeug dev-server fallback when hypercorn/asgiref are missing.
     app.run(port=5000)
 
 # ---------------------------
@@ -211,11 +385,24 @@ def start_flask():
 async def main():
     global async_loop
     async_loop = asyncio.get_running_loop()
+    if WsgiToAsgi is not None:
+        # HTTP shares the asyncio process instead of a Werkzeug thread;
+        # sync Flask handlers still run in asgiref's worker threads, so
+        # broadcast() keeps using run_coroutine_threadsafe.
+        config = HypercornConfig()
+        config.bind = ["0.0.0.0:5000"]
+        asyncio.ensure_future(hypercorn_serve(WsgiToAsgi(app), config))
     ws_server = None
     chosen_port = None
     for port in range(8080, 8086):
         try:
-            ws_server = await websockets.serve(ws_handler, "127.0.0.1", port)
+            # compression=None: the capture frames are already-compressed
+            # PNGs, so permessage-deflate only burns CPU on both ends.
+            # max_size raised to fit full-resolution capture payloads.
+            ws_server = await websockets.serve(
+                ws_handler, "127.0.0.1", port,
+                compression=None, max_size=8 * 1024 * 1024,
+            )
             chosen_port = port
             break
         except OSError:
@@ -229,6 +416,13 @@ async def main():
 # Entry
 # ---------------------------
 if __name__ == "__main__":
-    flask_thread = threading.Thread(target=start_flask, daemon=True)
-    flask_thread.start()
+    logging.basicConfig(level=logging.INFO)
+    try:  # libuv-backed event loop; big win for the image-heavy WS stream
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    if WsgiToAsgi is None:
+        flask_thread = threading.Thread(target=start_flask, daemon=True)
+        flask_thread.start()
     asyncio.run(main())